@@ -165,11 +165,23 @@ max_rollout_queue_size = 1
 
 use_jit = True
 
+# Mixed precision training uses bfloat16 if the GPU supports it (Nvidia Ampere / RTX 30xx or newer).
+# Otherwise, or if set to False, float16 is used with loss scaling.
+# bfloat16 has the same exponent range as float32, so gradients cannot underflow and no GradScaler is needed.
+# This is read once when training starts: changing it requires a restart.
+use_bfloat16_autocast = True
+
 # gpu_collectors_count is the number of Trackmania instances that will be launched in parallel.
 # It is recommended that users adjust this number depending on the performance of their machine.
 # We recommend trying different values and finding the one that maximises the number of batches done per unit of time.
 gpu_collectors_count = 2
 
+# As in Ape-X (https://arxiv.org/abs/1803.00933), each collector may explore with its own epsilon.
+# Collector i uses epsilon ** (1 + collector_epsilon_exponent_alpha * i / (gpu_collectors_count - 1)),
+# with epsilon given by epsilon_schedule.
+# With collector_epsilon_exponent_alpha = 0, all collectors use the same epsilon.
+collector_epsilon_exponent_alpha = 0
+
 send_shared_network_every_n_batches = 10
 update_inference_network_every_n_actions = 20
 
@@ -6,6 +6,7 @@ In this file, we define:
 """
 
 import copy
+import functools
 import math
 import random
 from typing import Optional, Tuple
@@ -19,6 +20,46 @@ from config_files import config_copy
 from trackmania_rl import utilities
 
 
+@functools.cache
+def get_autocast_dtype() -> torch.dtype:
+    """
+    Returns the dtype used for mixed precision with torch.amp.autocast.
+    This is bfloat16 if requested in config and natively supported by the GPU (compute capability 8.0 or newer), float16 otherwise.
+    torch.cuda.is_bf16_supported() is not used, as it also reports GPUs which only emulate bfloat16 and run it much slower than float16.
+    The result is cached, so that it stays consistent with the GradScaler created when training starts.
+    """
+    return (
+        torch.bfloat16
+        if config_copy.use_bfloat16_autocast and torch.cuda.is_available() and torch.cuda.get_device_capability()[0] >= 8
+        else torch.float16
+    )
+
+
+def get_torch_compile_mode(is_inference: bool) -> Optional[str]:
+    """
+    Returns the mode passed to torch.compile on linux.
+    CUDA graphs are only captured by torch.compile for inference, and ROCm builds of torch use the default mode.
+    """
+    if "rocm" in torch.__version__:
+        return None
+    return "max-autotune" if is_inference else "max-autotune-no-cudagraphs"
+
+
+class Conv2dWithInputNormalization(torch.nn.Conv2d):
+    """
+    Conv2d layer which takes raw pixel values in [0, 255] as input, and behaves as if these were normalized with (x - 128) / 128.
+
+    The affine normalization is folded in the (small) kernel and bias at each call, instead of being applied to the (large) image batch.
+    This is exact only without padding, as each output pixel then sums over a full kernel_size window of input pixels.
+    The layer's parameters are the same as those of a regular Conv2d applied on normalized images.
+    """
+
+    def forward(self, input: torch.Tensor) -> torch.Tensor:
+        bias = self.bias
+        assert bias is not None  # Refines Optional[Tensor] to Tensor for TorchScript
+        return self._conv_forward(input, self.weight / 128, bias - self.weight.sum(dim=(1, 2, 3)))
+
+
 class IQN_Network(torch.nn.Module):
     def __init__(
         self,
@@ -36,7 +77,7 @@ class IQN_Network(torch.nn.Module):
         img_head_channels = [1, 16, 32, 64, 32]
         activation_function = torch.nn.LeakyReLU
         self.img_head = torch.nn.Sequential(
-            torch.nn.Conv2d(in_channels=img_head_channels[0], out_channels=img_head_channels[1], kernel_size=(4, 4), stride=2),
+            Conv2dWithInputNormalization(in_channels=img_head_channels[0], out_channels=img_head_channels[1], kernel_size=(4, 4), stride=2),
             activation_function(inplace=True),
             torch.nn.Conv2d(in_channels=img_head_channels[1], out_channels=img_head_channels[2], kernel_size=(4, 4), stride=2),
             activation_function(inplace=True),
@@ -66,13 +107,19 @@ class IQN_Network(torch.nn.Module):
             torch.nn.Linear(dense_hidden_dimension // 2, 1),
         )
         self.iqn_fc = torch.nn.Sequential(torch.nn.Linear(iqn_embedding_dimension, dense_input_dimension), torch.nn.LeakyReLU(inplace=True))
+        # Constant basis i * pi for i in [1, iqn_embedding_dimension] used in the cosine embedding of quantiles.
+        # Not persistent: it is rebuilt at construction and stays out of state_dict(), checkpoints and weight decay.
+        self.register_buffer(
+            "iqn_cos_basis", torch.arange(1, iqn_embedding_dimension + 1, 1, dtype=torch.float32) * math.pi, persistent=False
+        )
         self.initialize_weights()
 
         self.n_actions = n_actions
 
         # States are not normalized when the method forward() is called. Normalization is done as the first step of the forward() method.
-        self.float_inputs_mean = torch.tensor(float_inputs_mean, dtype=torch.float32).to("cuda")
-        self.float_inputs_std = torch.tensor(float_inputs_std, dtype=torch.float32).to("cuda")
+        # (x - mean) / std is precomputed as x * scale + shift, to be applied in a single fused operation.
+        self.float_inputs_scale = torch.tensor(1 / float_inputs_std, dtype=torch.float32).to("cuda")
+        self.float_inputs_shift = torch.tensor(-float_inputs_mean / float_inputs_std, dtype=torch.float32).to("cuda")
 
     def initialize_weights(self):
         lrelu_neg_slope = 1e-2
@@ -106,8 +153,9 @@ class IQN_Network(torch.nn.Module):
         The Value and Advantage heads are combined to return the Q values directly.
 
         Args:
-            img: a torch.Tensor of shape (batch_size, 1, H, W) and type float16 or float32, depending on context.
-            float_inputs: a torch.Tensor of shape (batch_size, float_input_dim) and type float16 or float32, depending on context.
+            img: a torch.Tensor of shape (batch_size, 1, H, W) and a floating point type, depending on context.
+                 Contains raw pixel values in [0, 255].
+            float_inputs: a torch.Tensor of shape (batch_size, float_input_dim) and a floating point type, depending on context.
             num_quantiles: the number of quantiles, defined as N or N' in the IQN paper (https://arxiv.org/pdf/1806.06923).
             tau: if not None, a torch.Tensor of shape (batch_size * num_quantiles) the specifies the exact quantiles for which the neural network should return Q values
                  if None, the method will sample tau randomly in num_quantiles regularly spaced segments, and symmetrically around 0.5.
@@ -118,27 +166,28 @@ class IQN_Network(torch.nn.Module):
         """
         batch_size = img.shape[0]
         img_outputs = self.img_head(img)
-        float_outputs = self.float_feature_extractor((float_inputs - self.float_inputs_mean) / self.float_inputs_std)
+        float_outputs = self.float_feature_extractor(torch.addcmul(self.float_inputs_shift, float_inputs, self.float_inputs_scale))
+        # The concatenation is done before broadcasting over quantiles: it only copies a (batch_size, dense_input_dimension) tensor.
+        # Splitting A_head[0] and V_head[0] in img and float column blocks to avoid it would not save the (batch_size*num_quantiles, D)
+        # Hadamard product, which these layers need as input anyway.
         concat = torch.cat((img_outputs, float_outputs), 1)  # (batch_size, dense_input_dimension)
         if tau is None:
-            tau = (
-                torch.arange(num_quantiles // 2, device="cuda", dtype=torch.float32).repeat_interleave(batch_size).unsqueeze(1)
-                + torch.rand(size=(batch_size * num_quantiles // 2, 1), device="cuda", dtype=torch.float32)
-            ) / num_quantiles  # (batch_size * num_quantiles // 2, 1) (random numbers)
-            tau = torch.cat((tau, 1 - tau), dim=0)  # ensure that tau are sampled symmetrically
-        quantile_net = torch.cos(
-            torch.arange(1, self.iqn_embedding_dimension + 1, 1, device="cuda") * math.pi * tau
-        )  # (batch_size*num_quantiles, 1)
-        quantile_net = quantile_net.expand(
-            [-1, self.iqn_embedding_dimension]
-        )  # (batch_size*num_quantiles, iqn_embedding_dimension) (still random numbers)
+            # tau is filled in place, within a single allocation
+            tau = torch.empty(size=(batch_size * num_quantiles, 1), device="cuda", dtype=torch.float32)
+            tau_first_half = tau[: batch_size * num_quantiles // 2].uniform_()
+            tau_first_half.view(num_quantiles // 2, batch_size).add_(
+                torch.arange(num_quantiles // 2, device="cuda", dtype=torch.float32).unsqueeze(1)
+            ).div_(num_quantiles)  # (batch_size * num_quantiles // 2, 1) (random numbers)
+            tau[batch_size * num_quantiles // 2 :].copy_(tau_first_half).neg_().add_(1)  # ensure that tau are sampled symmetrically
+        quantile_net = torch.cos(self.iqn_cos_basis * tau)
+        # (batch_size*num_quantiles, iqn_embedding_dimension) (still random numbers)
         # (8 or 32 initial random numbers, expanded with cos to iqn_embedding_dimension)
         # (batch_size*num_quantiles, dense_input_dimension)
         quantile_net = self.iqn_fc(quantile_net)
         # (batch_size*num_quantiles, dense_input_dimension)
-        concat = concat.repeat(num_quantiles, 1)
+        # Rows of quantile_net are ordered quantile-major, concat is broadcast over quantiles instead of being repeated num_quantiles times
+        concat = (concat.unsqueeze(0) * quantile_net.view(num_quantiles, batch_size, -1)).view(batch_size * num_quantiles, -1)
         # (batch_size*num_quantiles, dense_input_dimension)
-        concat = concat * quantile_net
 
         A = self.A_head(concat)  # (batch_size*num_quantiles, n_actions)
         V = self.V_head(concat)  # (batch_size*num_quantiles, 1)
@@ -152,34 +201,126 @@ class IQN_Network(torch.nn.Module):
         return self
 
 
-@torch.compile(disable=not config_copy.is_linux, dynamic=False)
-def iqn_loss(targets: torch.Tensor, outputs: torch.Tensor, tau_outputs: torch.Tensor, num_quantiles: int, batch_size: int):
+def iqn_loss(targets: torch.Tensor, outputs: torch.Tensor, tau_outputs: torch.Tensor, num_quantiles: int, batch_size: int, kappa: float):
     """
     Implements the IQN loss as defined in the IQN paper (https://arxiv.org/pdf/1806.06923)
 
+    The loss is a chain of elementwise operations on (batch_size, num_quantiles, num_quantiles, 1) tensors, followed by a reduction.
+    It is compiled below so that this chain is fused instead of materializing each intermediate tensor.
+
     Args:
         targets: a torch.Tensor of shape (batch_size, num_quantiles, 1)
         outputs: a torch.Tensor of shape (batch_size, num_quantiles, 1)
         tau_outputs: a torch.Tensor of shape (batch_size * num_quantiles, 1)
         num_quantiles: (int)
         batch_size: (int)
+        kappa: (float) the threshold of the Huber loss
 
     Returns:
         loss: a torch.Tensor of shape (batch_size, )
     """
     TD_error = targets[:, :, None, :] - outputs[:, None, :, :]
     # (batch_size, iqn_n, iqn_n, 1)
+    abs_TD_error = torch.abs(TD_error)
     loss = torch.where(
-        torch.lt(torch.abs(TD_error), config_copy.iqn_kappa),
-        (0.5 / config_copy.iqn_kappa) * TD_error**2,
-        (torch.abs(TD_error) - 0.5 * config_copy.iqn_kappa),
+        torch.lt(abs_TD_error, kappa),
+        (0.5 / kappa) * TD_error**2,
+        abs_TD_error - 0.5 * kappa,
     )
     tau = tau_outputs.reshape([num_quantiles, batch_size, 1]).transpose(0, 1)  # (batch_size, iqn_n, 1)
-    tau = tau[:, None, :, :].expand([-1, num_quantiles, -1, -1])  # (batch_size, iqn_n, iqn_n, 1)
+    tau = tau[:, None, :, :]  # (batch_size, 1, iqn_n, 1), broadcast along dim 1 instead of being expanded
     loss = (torch.where(torch.lt(TD_error, 0), 1 - tau, tau) * loss).sum(dim=2).mean(dim=1)[:, 0]  # pinball loss # (batch_size, )
     return loss
 
 
+# Same compilation strategy as in make_untrained_iqn_network(): if use_jit, torch.compile on linux and TorchScript elsewhere.
+# kappa is an argument rather than read from config_copy, as TorchScript would freeze it at compilation time.
+if config_copy.use_jit:
+    iqn_loss = torch.compile(iqn_loss, dynamic=False) if config_copy.is_linux else torch.jit.script(iqn_loss)
+
+
+@torch.compile(disable=not (config_copy.use_jit and config_copy.is_linux), dynamic=False, mode=get_torch_compile_mode(is_inference=False))
+def iqn_targets(
+    online_network: IQN_Network,
+    target_network: IQN_Network,
+    rewards: torch.Tensor,
+    next_state_img_tensor: torch.Tensor,
+    next_state_float_tensor: torch.Tensor,
+    gammas_terminal: torch.Tensor,
+    num_quantiles: int,
+    batch_size: int,
+    use_ddqn: bool,
+):
+    """
+    Builds the IQN targets for a batch of transitions, with the target network evaluated on randomly sampled quantiles tau2.
+    Must be called within torch.no_grad().
+
+    This is compiled as a single graph, so that the chain of small operations between network calls is fused.
+    It is compiled under the same conditions and with the same mode as the training networks in make_untrained_iqn_network().
+
+    Args:
+        online_network: only used to choose the next action when use_ddqn == True
+        target_network:
+        rewards: a torch.Tensor of shape (batch_size, )
+        next_state_img_tensor: a torch.Tensor of shape (batch_size, 1, H, W)
+        next_state_float_tensor: a torch.Tensor of shape (batch_size, float_input_dim)
+        gammas_terminal: a torch.Tensor of shape (batch_size, ), equal to 0 for terminal transitions
+        num_quantiles: (int)
+        batch_size: (int)
+        use_ddqn: a boolean indicating whether the next action is chosen by online_network (DDQN) or target_network
+
+    Returns:
+        targets: a torch.Tensor of shape (batch_size, num_quantiles, 1)
+        tau2: a torch.Tensor of shape (batch_size * num_quantiles, 1)
+    """
+    rewards = rewards[None, :, None]  # (1, batch_size, 1), broadcast over quantiles instead of being repeated iqn_n times
+    gammas_terminal = gammas_terminal[None, :, None]  # (1, batch_size, 1)
+    #
+    #   Use target_network to evaluate the action chosen, per quantile.
+    #
+    q__stpo__target__quantiles_tau2, tau2 = target_network(
+        next_state_img_tensor, next_state_float_tensor, num_quantiles, tau=None
+    )  # (batch_size*iqn_n, n_actions)
+    q__stpo__target__quantiles_tau2 = q__stpo__target__quantiles_tau2.reshape(
+        [num_quantiles, batch_size, -1]
+    )  # (iqn_n, batch_size, n_actions), rows are ordered quantile-major
+    #
+    #   Use online network to choose an action for next state.
+    #   This action is chosen AFTER reduction to the mean, and used for all quantiles
+    #   The online network is evaluated on the same quantiles tau2, which do not need to be sampled again
+    #
+    if use_ddqn:
+        a__tpo__online__reduced = (
+            online_network(
+                next_state_img_tensor,
+                next_state_float_tensor,
+                num_quantiles,
+                tau=tau2,
+            )[0]
+            .reshape([num_quantiles, batch_size, -1])
+            .mean(dim=0)
+            .argmax(dim=1, keepdim=True)
+        )  # (batch_size, 1)
+        #
+        #   Evaluate this action with target_network on tau2 quantiles
+        #
+        q__stpo__target__quantiles_tau2__a__tpo = q__stpo__target__quantiles_tau2.gather(
+            2, a__tpo__online__reduced.expand([num_quantiles, -1, -1])
+        )  # (iqn_n, batch_size, 1)
+    else:
+        q__stpo__target__quantiles_tau2__a__tpo = q__stpo__target__quantiles_tau2.max(dim=2, keepdim=True)[0]  # (iqn_n, batch_size, 1)
+    #
+    #   Bellman update rewards + gammas_terminal * Q(next_state, next_action), as a single fused operation
+    #
+    outputs_target_tau2 = torch.addcmul(rewards, gammas_terminal, q__stpo__target__quantiles_tau2__a__tpo)  # (iqn_n, batch_size, 1)
+
+    #
+    #   This is our target
+    #
+    outputs_target_tau2 = outputs_target_tau2.transpose(0, 1)  # (batch_size, iqn_n, 1)
+    return outputs_target_tau2, tau2
+
+
 class Trainer:
     __slots__ = (
         "online_network",
@@ -231,7 +372,7 @@ class Trainer:
         """
         self.optimizer.zero_grad(set_to_none=True)
 
-        with torch.amp.autocast(device_type="cuda", dtype=torch.float16):
+        with torch.amp.autocast(device_type="cuda", dtype=get_autocast_dtype()):
             with torch.no_grad():
                 batch, batch_info = buffer.sample(self.batch_size, return_info=True)
                 (
@@ -246,64 +387,36 @@ class Trainer:
                 if config_copy.prio_alpha > 0:
                     IS_weights = torch.from_numpy(batch_info["_weight"]).to("cuda", non_blocking=True)
 
-                rewards = rewards.unsqueeze(-1).repeat(
-                    [self.iqn_n, 1]
-                )  # (batch_size*iqn_n, 1)     a,b,c,d becomes a,b,c,d,a,b,c,d,a,b,c,d,... (iqn_n times)
-                gammas_terminal = gammas_terminal.unsqueeze(-1).repeat([self.iqn_n, 1])  # (batch_size*iqn_n, 1)
-                actions = actions.unsqueeze(-1).repeat([self.iqn_n, 1])  # (batch_size*iqn_n, 1)
-                #
-                #   Use target_network to evaluate the action chosen, per quantile.
-                #
-                q__stpo__target__quantiles_tau2, tau2 = self.target_network(
-                    next_state_img_tensor, next_state_float_tensor, self.iqn_n, tau=None
-                )  # (batch_size*iqn_n, n_actions)
-                #
-                #   Use online network to choose an action for next state.
-                #   This action is chosen AFTER reduction to the mean, and repeated to all quantiles
-                #
-                if config_copy.use_ddqn:
-                    a__tpo__online__reduced_repeated = (
-                        self.online_network(
-                            next_state_img_tensor,
-                            next_state_float_tensor,
-                            self.iqn_n,
-                            tau=None,
-                        )[0]
-                        .reshape([self.iqn_n, self.batch_size, self.online_network.n_actions])
-                        .mean(dim=0)
-                        .argmax(dim=1, keepdim=True)
-                        .repeat([self.iqn_n, 1])
-                    )  # (iqn_n * batch_size, 1)
-                    #
-                    #   Build IQN target on tau2 quantiles
-                    #
-                    outputs_target_tau2 = rewards + gammas_terminal * q__stpo__target__quantiles_tau2.gather(
-                        1, a__tpo__online__reduced_repeated
-                    )  # (batch_size*iqn_n, 1)
-                else:
-                    outputs_target_tau2 = (
-                        rewards + gammas_terminal * q__stpo__target__quantiles_tau2.max(dim=1, keepdim=True)[0]
-                    )  # (batch_size*iqn_n, 1)
-
-                #
-                #   This is our target
-                #
-                outputs_target_tau2 = outputs_target_tau2.reshape([self.iqn_n, self.batch_size, 1]).transpose(
-                    0, 1
+                actions = actions[None, :, None].expand([self.iqn_n, -1, -1])  # (iqn_n, batch_size, 1), a view without copy
+                outputs_target_tau2, tau2 = iqn_targets(
+                    self.online_network,
+                    self.target_network,
+                    rewards,
+                    next_state_img_tensor,
+                    next_state_float_tensor,
+                    gammas_terminal,
+                    self.iqn_n,
+                    self.batch_size,
+                    config_copy.use_ddqn,
                 )  # (batch_size, iqn_n, 1)
 
             q__st__online__quantiles_tau3, tau3 = self.online_network(
                 state_img_tensor, state_float_tensor, self.iqn_n, tau=None
             )  # (batch_size*iqn_n,n_actions)
             outputs_tau3 = (
-                q__st__online__quantiles_tau3.gather(1, actions).reshape([self.iqn_n, self.batch_size, 1]).transpose(0, 1)
+                q__st__online__quantiles_tau3.reshape([self.iqn_n, self.batch_size, -1]).gather(2, actions).transpose(0, 1)
             )  # (batch_size, iqn_n, 1)
 
-            loss = iqn_loss(outputs_target_tau2, outputs_tau3, tau3, config_copy.iqn_n, config_copy.batch_size)
+            loss = iqn_loss(outputs_target_tau2, outputs_tau3, tau3, config_copy.iqn_n, config_copy.batch_size, config_copy.iqn_kappa)
 
             target_self_loss = torch.sqrt(
                 iqn_loss(
-                    outputs_target_tau2.detach(), outputs_target_tau2.detach(), tau2.detach(), config_copy.iqn_n, config_copy.batch_size
+                    outputs_target_tau2.detach(),
+                    outputs_target_tau2.detach(),
+                    tau2.detach(),
+                    config_copy.iqn_n,
+                    config_copy.batch_size,
+                    config_copy.iqn_kappa,
                 )
             )
 
@@ -322,17 +435,16 @@ class Trainer:
 
                 # Gradient clipping : https://pytorch.org/docs/stable/notes/amp_examples.html#gradient-clipping
                 self.scaler.unscale_(self.optimizer)
-                grad_norm = (
-                    torch.nn.utils.clip_grad_norm_(self.online_network.parameters(), config_copy.clip_grad_norm).detach().cpu().item()
-                )
+                grad_norm = torch.nn.utils.clip_grad_norm_(self.online_network.parameters(), config_copy.clip_grad_norm).detach()
                 torch.nn.utils.clip_grad_value_(self.online_network.parameters(), config_copy.clip_grad_value)
 
                 self.scaler.step(self.optimizer)
                 self.scaler.update()
             else:
-                grad_norm = 0
+                grad_norm = torch.zeros((), device="cuda")
 
-            total_loss = total_loss.detach().cpu()
+            # Loss and gradient norm are brought back to the CPU together, with a single synchronization at the end of the step
+            total_loss, grad_norm = torch.stack((total_loss.detach().float(), grad_norm.float())).tolist()
             if config_copy.prio_alpha > 0:
                 mask_update_priority = torch.lt(state_float_tensor[:, 0], config_copy.min_horizon_to_update_priority_actions).detach().cpu()
                 # Only update the transition priority if the transition was sampled with a sufficiently long-term horizon.
@@ -355,15 +467,25 @@ class Inferer:
         "epsilon_boltzmann",
         "tau_epsilon_boltzmann",
         "is_explo",
+        "use_cuda_graph",
+        "cuda_graph",
+        "cuda_graph_img_input",
+        "cuda_graph_float_input",
+        "cuda_graph_q_values",
     )
 
-    def __init__(self, inference_network, iqn_k, tau_epsilon_boltzmann):
+    def __init__(self, inference_network, iqn_k, tau_epsilon_boltzmann, use_cuda_graph=False):
         self.inference_network = inference_network
         self.iqn_k = iqn_k
         self.epsilon = None
         self.epsilon_boltzmann = None
         self.tau_epsilon_boltzmann = tau_epsilon_boltzmann
         self.is_explo = None
+        self.use_cuda_graph = use_cuda_graph
+        self.cuda_graph = None
+        self.cuda_graph_img_input = None
+        self.cuda_graph_float_input = None
+        self.cuda_graph_q_values = None
 
     def infer_network(self, img_inputs_uint8: npt.NDArray, float_inputs: npt.NDArray, tau=None) -> npt.NDArray:
         """
@@ -378,12 +500,13 @@ class Inferer:
             q_values:           a numpy array of shape (iqn_k, 1)
         """
         with torch.no_grad():
+            if self.use_cuda_graph and tau is None:
+                return self.infer_network_with_cuda_graph(img_inputs_uint8, float_inputs)
             state_img_tensor = (
                 torch.from_numpy(img_inputs_uint8)
                 .unsqueeze(0)
                 .to("cuda", memory_format=torch.channels_last, non_blocking=True, dtype=torch.float32)
-                - 128
-            ) / 128
+            )
             state_float_tensor = torch.from_numpy(np.expand_dims(float_inputs, axis=0)).to("cuda", non_blocking=True)
             q_values = (
                 self.inference_network(
@@ -398,6 +521,35 @@ class Inferer:
             )
             return q_values
 
+    def infer_network_with_cuda_graph(self, img_inputs_uint8: npt.NDArray, float_inputs: npt.NDArray) -> npt.NDArray:
+        """
+        Same as infer_network() with tau=None, but the forward pass is captured in a CUDA graph on the first call, and replayed afterwards.
+
+        With a batch size of 1, inference is bound by kernel launch overhead: replaying the graph launches all kernels at once.
+        The graph reads weights from their memory location: in-place updates with load_state_dict() are taken into account.
+        Must be called within torch.no_grad().
+        """
+        if self.cuda_graph is None:
+            self.cuda_graph_img_input = torch.zeros((1,) + img_inputs_uint8.shape, device="cuda", dtype=torch.float32).contiguous(
+                memory_format=torch.channels_last
+            )
+            self.cuda_graph_float_input = torch.zeros((1,) + float_inputs.shape, device="cuda", dtype=torch.float32)
+            # Warmup on a side stream, as recommended in https://pytorch.org/docs/stable/notes/cuda.html#cuda-graphs
+            side_stream = torch.cuda.Stream()
+            side_stream.wait_stream(torch.cuda.current_stream())
+            with torch.cuda.stream(side_stream):
+                for _ in range(3):
+                    self.inference_network(self.cuda_graph_img_input, self.cuda_graph_float_input, self.iqn_k)
+            torch.cuda.current_stream().wait_stream(side_stream)
+            self.cuda_graph = torch.cuda.CUDAGraph()
+            with torch.cuda.graph(self.cuda_graph):
+                self.cuda_graph_q_values = self.inference_network(self.cuda_graph_img_input, self.cuda_graph_float_input, self.iqn_k)[0]
+
+        self.cuda_graph_img_input.copy_(torch.from_numpy(img_inputs_uint8).unsqueeze(0))
+        self.cuda_graph_float_input.copy_(torch.from_numpy(float_inputs).unsqueeze(0))
+        self.cuda_graph.replay()
+        return self.cuda_graph_q_values.cpu().numpy().astype(np.float32)
+
     def get_exploration_action(self, img_inputs_uint8: npt.NDArray, float_inputs: npt.NDArray) -> Tuple[int, bool, float, npt.NDArray]:
         """
         Selects an action according to the exploration strategy.
@@ -460,8 +612,7 @@ def make_untrained_iqn_network(jit: bool, is_inference: bool) -> Tuple[IQN_Netwo
     )
     if jit:
         if config_copy.is_linux:
-            compile_mode = None if "rocm" in torch.__version__ else ("max-autotune" if is_inference else "max-autotune-no-cudagraphs")
-            model = torch.compile(uncompiled_model, dynamic=False, mode=compile_mode)
+            model = torch.compile(uncompiled_model, dynamic=False, mode=get_torch_compile_mode(is_inference))
         else:
             model = torch.jit.script(uncompiled_model)
     else:
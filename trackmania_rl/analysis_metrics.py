@@ -15,7 +15,7 @@ import torch
 from PIL import Image
 
 from config_files import config_copy
-from trackmania_rl.agents.iqn import iqn_loss
+from trackmania_rl.agents.iqn import get_autocast_dtype, iqn_loss
 
 
 def batched(iterable, n):  # Can be included from itertools with python >=3.12
@@ -220,7 +220,7 @@ def get_output_and_target_for_batch(batch, online_network, target_network, num_q
     next_state_float_tensor[:, 0] = state_float_tensor[:, 0] + delta
 
     tau = torch.linspace(0, 1, num_quantiles, device="cuda").repeat_interleave(batch_size).unsqueeze(1)
-    with torch.amp.autocast(device_type="cuda", dtype=torch.float16):
+    with torch.amp.autocast(device_type="cuda", dtype=get_autocast_dtype()):
         with torch.no_grad():
             rewards = rewards.unsqueeze(-1).repeat(
                 [num_quantiles, 1]
@@ -252,9 +252,11 @@ def get_output_and_target_for_batch(batch, online_network, target_network, num_q
             )  # (batch_size, iqn_n, 1)
 
     losses = {
-        "target_self_loss": iqn_loss(outputs_target_tau2, outputs_target_tau2, tau, num_quantiles, batch_size).cpu().numpy(),
-        "output_self_loss": iqn_loss(outputs_tau3, outputs_tau3, tau, num_quantiles, batch_size).cpu().numpy(),
-        "real_loss": iqn_loss(outputs_target_tau2, outputs_tau3, tau, num_quantiles, batch_size).cpu().numpy(),
+        "target_self_loss": iqn_loss(outputs_target_tau2, outputs_target_tau2, tau, num_quantiles, batch_size, config_copy.iqn_kappa)
+        .cpu()
+        .numpy(),
+        "output_self_loss": iqn_loss(outputs_tau3, outputs_tau3, tau, num_quantiles, batch_size, config_copy.iqn_kappa).cpu().numpy(),
+        "real_loss": iqn_loss(outputs_target_tau2, outputs_tau3, tau, num_quantiles, batch_size, config_copy.iqn_kappa).cpu().numpy(),
     }
 
     return (
@@ -17,6 +17,7 @@ from torchrl.data.replay_buffers.storages import Storage
 from torchrl.data.replay_buffers.utils import INT_CLASSES, _to_numpy
 
 from config_files import config_copy
+from trackmania_rl.agents.iqn import get_autocast_dtype
 
 to_torch_dtype = {
     "uint8": torch.uint8,
@@ -28,48 +29,69 @@ to_torch_dtype = {
 }
 
 
-def fast_collate_cpu(batch, attr_name):
+def fast_collate_cpu(batch, attr_name, pin_memory, data_type=None):
     elem = getattr(batch[0], attr_name)
     elem_array = hasattr(elem, "__len__")
     shape = (len(batch),) + (elem.shape if elem_array else ())
-    data_type = elem.flat[0].dtype if elem_array else type(elem).__name__
-    data_type = to_torch_dtype[str(data_type)]
-    buffer = torch.empty(size=shape, dtype=data_type, pin_memory=True).numpy()
+    if data_type is None:
+        data_type = elem.flat[0].dtype if elem_array else type(elem).__name__
+        data_type = to_torch_dtype[str(data_type)]
+    buffer = torch.empty(size=shape, dtype=data_type, pin_memory=pin_memory).numpy()
     source = [getattr(memory, attr_name) for memory in batch]
-    buffer[:] = source[:]
+    if elem_array:
+        # Write each array directly in the destination buffer, without building an intermediate array first.
+        np.stack(source, out=buffer)
+    else:
+        buffer[:] = source
     return buffer
 
 
-def send_to_gpu(batch, attr_name):
-    return torch.as_tensor(batch).to(
-        non_blocking=True, device="cuda", memory_format=torch.channels_last if "img" in attr_name else torch.preserve_format
-    )
+def fast_collate_cpu_state_and_next_state(batch, attr_name, next_attr_name):
+    # Collates two attributes with the same shape and dtype in a single pinned buffer of shape (2, batch_size, ...),
+    # so that state and next_state are sent to the GPU in a single transfer.
+    elem = getattr(batch[0], attr_name)
+    shape = (2, len(batch)) + elem.shape
+    data_type = to_torch_dtype[str(elem.flat[0].dtype)]
+    buffer = torch.empty(size=shape, dtype=data_type, pin_memory=True).numpy()
+    np.stack([getattr(memory, attr_name) for memory in batch], out=buffer[0])
+    np.stack([getattr(memory, next_attr_name) for memory in batch], out=buffer[1])
+    return buffer
+
+
+def copy_to_pinned_memory(array):
+    # Data computed on the CPU must be staged in pinned memory for a non_blocking transfer to be truly asynchronous.
+    buffer = torch.empty(size=array.shape, dtype=to_torch_dtype[str(array.dtype)], pin_memory=True).numpy()
+    buffer[:] = array
+    return buffer
+
+
+def send_to_gpu(batch):
+    return torch.as_tensor(batch).to(non_blocking=True, device="cuda")
 
 
 def buffer_collate_function(batch):
+    assert len(config_copy.inputs) <= 256, "Actions are collated as uint8, action indices must fit in a byte"
     (
-        state_img,
-        state_float,
         state_potential,
         action,
         rewards,
-        next_state_img,
-        next_state_float,
         next_state_potential,
         gammas,
         terminal_actions,
         n_steps,
     ) = tuple(
         map(
-            lambda attr_name: fast_collate_cpu(batch, attr_name),
+            lambda attr_name: fast_collate_cpu(
+                batch,
+                attr_name,
+                pin_memory=attr_name == "action",
+                # Action indices fit in a byte (see config_files/inputs_list.py): this shrinks their transfer to the GPU 8x
+                data_type=torch.uint8 if attr_name == "action" else None,
+            ),
             [
-                "state_img",
-                "state_float",
                 "state_potential",
                 "action",
                 "rewards",
-                "next_state_img",
-                "next_state_float",
                 "next_state_potential",
                 "gammas",
                 "terminal_actions",
@@ -77,6 +99,11 @@ def buffer_collate_function(batch):
             ],
         )
     )
+    state_and_next_state_img = fast_collate_cpu_state_and_next_state(batch, "state_img", "next_state_img")
+    state_and_next_state_float = fast_collate_cpu_state_and_next_state(batch, "state_float", "next_state_float")
+    # Views on the pinned buffers: in-place modifications below are sent to the GPU.
+    state_img, next_state_img = state_and_next_state_img
+    state_float, next_state_float = state_and_next_state_float
 
     temporal_mini_race_current_time_actions = (
         np.abs(
@@ -111,32 +138,28 @@ def buffer_collate_function(batch):
     rewards += np.where(terminal, 0, gammas * next_state_potential)
     rewards -= state_potential
 
-    state_img, state_float, action, rewards, next_state_img, next_state_float, gammas = tuple(
+    rewards = copy_to_pinned_memory(rewards)
+    gammas = copy_to_pinned_memory(gammas)
+
+    state_and_next_state_img, state_and_next_state_float, action, rewards, gammas = tuple(
         map(
-            lambda batch, attr_name: send_to_gpu(batch, attr_name),
+            send_to_gpu,
             [
-                state_img,
-                state_float,
+                state_and_next_state_img,
+                state_and_next_state_float,
                 action,
                 rewards,
-                next_state_img,
-                next_state_float,
                 gammas,
             ],
-            [
-                "state_img",
-                "state_float",
-                "action",
-                "rewards",
-                "next_state_img",
-                "next_state_float",
-                "gammas",
-            ],
         )
     )
 
-    state_img = (state_img.to(torch.float16) - 128) / 128
-    next_state_img = (next_state_img.to(torch.float16) - 128) / 128
+    # Images are kept as raw pixel values, normalization is folded in the first convolution of IQN_Network.
+    state_img, next_state_img = (
+        img.contiguous(memory_format=torch.channels_last) for img in state_and_next_state_img.to(get_autocast_dtype())
+    )
+    state_float, next_state_float = state_and_next_state_float
+    action = action.to(torch.int64)  # torch.gather() requires int64 indices
 
     if config_copy.apply_randomcrop_augmentation:
         # Same transformation is applied for state and next_state.
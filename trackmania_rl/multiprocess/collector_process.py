@@ -25,6 +25,7 @@ def collector_process_fn(
     base_dir: Path,
     save_dir: Path,
     tmi_port: int,
+    process_number: int,
 ):
     from trackmania_rl.map_loader import analyze_map_cycle, load_next_map_zone_centers
     from trackmania_rl.tmi_interaction import game_instance_manager
@@ -44,7 +45,15 @@ def collector_process_fn(
     except Exception as e:
         print("Worker could not load weights, exception:", e)
 
-    inferer = iqn.Inferer(inference_network, config_copy.iqn_k, config_copy.tau_epsilon_boltzmann)
+    # When torch.compile(mode="max-autotune") is used, the inference network is already wrapped in CUDA graphs
+    inferer = iqn.Inferer(
+        inference_network,
+        config_copy.iqn_k,
+        config_copy.tau_epsilon_boltzmann,
+        use_cuda_graph=not (
+            config_copy.use_jit and config_copy.is_linux and iqn.get_torch_compile_mode(is_inference=True) == "max-autotune"
+        ),
+    )
 
     def update_network():
         # Update weights of the inference network
@@ -94,7 +103,9 @@ def collector_process_fn(
         map_name, map_path, zone_centers_filename, is_explo, fill_buffer = next_map_tuple
         map_status = "trained" if map_name in set_maps_trained else "blind"
 
-        inferer.epsilon = utilities.from_exponential_schedule(config_copy.epsilon_schedule, shared_steps.value)
+        inferer.epsilon = utilities.from_exponential_schedule(config_copy.epsilon_schedule, shared_steps.value) ** (
+            1 + config_copy.collector_epsilon_exponent_alpha * process_number / max(1, config_copy.gpu_collectors_count - 1)
+        )
         inferer.epsilon_boltzmann = utilities.from_exponential_schedule(config_copy.epsilon_boltzmann_schedule, shared_steps.value)
         inferer.tau_epsilon_boltzmann = config_copy.tau_epsilon_boltzmann
         inferer.is_explo = is_explo
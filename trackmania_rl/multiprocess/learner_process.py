@@ -160,7 +160,8 @@ def learner_process_fn(
     )
     # optimizer1 = torch_optimizer.Lookahead(optimizer1, k=5, alpha=0.5)
 
-    scaler = torch.amp.GradScaler("cuda")
+    # Loss scaling is only needed to prevent gradient underflow with float16
+    scaler = torch.amp.GradScaler("cuda", enabled=iqn.get_autocast_dtype() == torch.float16)
     memory_size, memory_size_start_learn = utilities.from_staircase_schedule(
         config_copy.memory_size_schedule, accumulated_stats["cumul_number_memories_generated"]
     )
@@ -502,9 +503,14 @@ def learner_process_fn(
                     loss_history.append(loss)
                     if not math.isinf(grad_norm):
                         grad_norm_history.append(grad_norm)
-                        for name, param in online_network.named_parameters():
-                            layer_grad_norm_history[f"L2_grad_norm_{name}"].append(torch.norm(param.grad.detach(), 2.0).item())
-                            layer_grad_norm_history[f"Linf_grad_norm_{name}"].append(torch.norm(param.grad.detach(), float("inf")).item())
+                        names, grads = zip(*[(name, param.grad.detach()) for name, param in online_network.named_parameters()])
+                        # All layer norms are transferred to the CPU at once, instead of synchronizing twice per parameter
+                        layer_grad_norms = torch.stack(
+                            [torch.stack((torch.norm(g, 2.0), torch.norm(g, float("inf")))) for g in grads]
+                        ).tolist()
+                        for name, (l2_grad_norm, linf_grad_norm) in zip(names, layer_grad_norms):
+                            layer_grad_norm_history[f"L2_grad_norm_{name}"].append(l2_grad_norm)
+                            layer_grad_norm_history[f"Linf_grad_norm_{name}"].append(linf_grad_norm)
 
                     accumulated_stats["cumul_number_batches_done"] += 1
                     print(f"B    {loss=:<8.2e} {grad_norm=:<8.2e} {train_on_batch_duration_history[-1]*1000:<8.1f}")
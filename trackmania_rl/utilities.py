@@ -52,21 +52,26 @@ def soft_copy_param(target_link, source_link, tau):
     """Soft-copy parameters of a link to another link."""
     target_dict = target_link.state_dict()
     source_dict = source_link.state_dict()
+    target_values = []
+    source_values = []
     for k, target_value in target_dict.items():
         source_value = source_dict[k]
         if source_value.dtype in [torch.float32, torch.float64, torch.float16]:
-            linear_combination(target_value, source_value, tau)
+            target_values.append(target_value)
+            source_values.append(source_value)
         else:
             # Scalar type
             # Some modules such as BN has scalar value `num_batches_tracked`
             target_dict[k] = source_value
             assert False, "Soft scalar update should not happen"
+    # Same as linear_combination() on each tensor, with a single multi-tensor kernel launch instead of two launches per tensor
+    torch._foreach_lerp_(target_values, source_values, tau)
 
 
 def custom_weight_decay(target_link, decay_factor):
     target_dict = target_link.state_dict()
-    for k, target_value in target_dict.items():
-        target_value.mul_(decay_factor)
+    # Single multi-tensor kernel launch instead of one launch per tensor, this is called after every batch
+    torch._foreach_mul_(list(target_dict.values()), decay_factor)
 
 
 def from_exponential_schedule(schedule: List[Tuple[int, float]], current_step: int):